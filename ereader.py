@@ -1,10 +1,28 @@
 #!/usr/bin/env python3
+import collections
+import concurrent.futures
+import fractions
+import hashlib
+import os
+import queue
+import threading
+import zlib
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import fitz  # PyMuPDF
-from PIL import Image, ImageTk
+
+# Rendered pages persist here across sessions, one directory per PDF version
+DISK_CACHE_ROOT = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "ereader")
+# Least recently used files are removed once the disk cache grows past this
+DISK_CACHE_MAX_BYTES = 256 * 1024 * 1024
 
 class PDFReader(tk.Tk):
+    # Maximum number of rendered pages kept in memory
+    PAGE_CACHE_SIZE = 16
+    # Largest Tk subsample factor used for zoom previews; higher is more
+    # accurate in size but blockier
+    PREVIEW_MAX_SUBSAMPLE = 8
+
     def __init__(self, pdf_path=None):
         super().__init__()
 
@@ -14,13 +32,46 @@ class PDFReader(tk.Tk):
 
         # State variables
         self.pdf_doc = None
+        self._disk_cache_dir = None
         self.current_page_index = 0
         self.total_pages = 0
         self.zoom_level = 100  # Default zoom level (in percentage)
+        self._zoom_after = None  # Pending deferred render after a zoom change
+        self.tk_img = None  # Image currently on the canvas
+        self.night_mode = False  # Render pages with inverted colors
+        self.grayscale = False  # Render pages at 1 byte per pixel
+
+        # LRU cache of rendered pages:
+        # (page_index, zoom_level, viewport, night_mode, grayscale) -> (PhotoImage, width, height)
+        self._page_cache = collections.OrderedDict()
+
+        # Background prefetch of neighbouring pages; PyMuPDF documents are not
+        # thread-safe, so every rasterization goes through _render_lock. That
+        # makes _rasterize, _render_source and _photo_source safe to call from
+        # any thread
+        self._render_lock = threading.Lock()
+        self._prefetch_q = queue.Queue()
+        self._prefetch_thread = threading.Thread(target=self._prefetch_worker, daemon=True)
+        self._prefetch_thread.start()
+
+        # Pages the user asks for are rendered off the Tk thread as well, so the
+        # window stays responsive; only the latest request is kept
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self._render_future = None
+        self._render_key = None
+        # Disk cache files are written by their own worker after the page has
+        # been handed to Tk; zlib releases the GIL while it compresses
+        self._disk_writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
         # Canvas to display PDF pages
         self.canvas = tk.Canvas(self, background="black")
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        # Single image item whose image is swapped on every page change
+        self._canvas_item = self.canvas.create_image(0, 0, anchor=tk.NW)
+        self._viewport = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        self._resize_after = None
+        self._pending_page = None  # Page to show once the canvas has a real size
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
 
         # Controls Frame
         self.controls_frame = tk.Frame(self, bg="gray")
@@ -46,11 +97,21 @@ class PDFReader(tk.Tk):
         self.fullscreen_btn = tk.Button(self.controls_frame, text="Fullscreen", command=self.toggle_fullscreen)
         self.fullscreen_btn.pack(side=tk.LEFT, padx=5, pady=5)
 
+        # Night mode toggle button
+        self.night_btn = tk.Button(self.controls_frame, text="Night Mode", command=self.toggle_night_mode)
+        self.night_btn.pack(side=tk.LEFT, padx=5, pady=5)
+
+        # Grayscale toggle button
+        self.gray_btn = tk.Button(self.controls_frame, text="Grayscale", command=self.toggle_grayscale)
+        self.gray_btn.pack(side=tk.LEFT, padx=5, pady=5)
+
         # Bindings for Zoom
         #self.bind("<Control-minus>", self.zoom_out)
         #self.bind("<Control-plus>", self.zoom_in)
         self.bind("<Control-KeyPress-minus>", self.zoom_out)
         self.bind("<Control-KeyPress-equal>", self.zoom_in)
+        self.bind("<Control-KeyPress-i>", self.toggle_night_mode)
+        self.bind("<Control-KeyPress-g>", self.toggle_grayscale)
 
         # Open PDF on startup if provided; otherwise prompt for file
         if pdf_path:
@@ -76,9 +137,18 @@ class PDFReader(tk.Tk):
         """Load the given PDF file using PyMuPDF."""
         try:
             self.pdf_doc = fitz.open(pdf_file)
+            abs_path = os.path.abspath(pdf_file)
+            doc_id = hashlib.sha1((abs_path + str(os.path.getmtime(abs_path))).encode()).hexdigest()
+            self._disk_cache_dir = os.path.join(DISK_CACHE_ROOT, doc_id)
             self.current_page_index = 0
             self.total_pages = len(self.pdf_doc)
-            self.show_page(self.current_page_index)
+            self._page_cache.clear()
+            if self._viewport[0] > 10:
+                self.show_page(self.current_page_index)
+            else:
+                # The canvas is not mapped yet; rendering now would fit the page
+                # to a 1x1 viewport, so wait for the first real <Configure>
+                self._pending_page = self.current_page_index
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open PDF:\n{e}")
             self.destroy()
@@ -90,33 +160,216 @@ class PDFReader(tk.Tk):
         if page_index < 0 or page_index >= self.total_pages:
             return
 
-        page = self.pdf_doc[page_index]
-        # Apply zoom level (100 dpi is default, scaled by zoom level)
-        zoom_matrix = fitz.Matrix(self.zoom_level / 100, self.zoom_level / 100)
-        pix = page.get_pixmap(matrix=zoom_matrix)
-        mode = "RGB" if pix.alpha == 0 else "RGBA"
-
-        # Convert PyMuPDF pixmap to PIL Image
-        img = Image.frombytes(mode, [pix.width, pix.height], pix.samples)
+        key = self._cache_key(page_index)
+        if key not in self._page_cache:
+            self._request_render(key)
+            return
 
-        # Convert PIL image to a Tkinter image
-        self.tk_img = ImageTk.PhotoImage(img)
+        self._page_cache.move_to_end(key)
+        self.tk_img, width, height = self._page_cache[key]
+        self._draw_page(page_index, width, height)
+        self._schedule_prefetch(page_index)
+
+    def _request_render(self, key):
+        """Render a page in the background and show it once it is ready."""
+        if self._render_future is not None and not self._render_future.done():
+            if key == self._render_key:
+                return
+            self._render_future.cancel()  # The user has already moved on
+
+        pdf_doc = self.pdf_doc
+        future = self._executor.submit(self._render_source, pdf_doc, self._disk_cache_dir, key)
+        future.add_done_callback(lambda f: self._on_render_done(pdf_doc, key, f))
+        self._render_future = future
+        self._render_key = key
+
+    def _on_render_done(self, pdf_doc, key, future):
+        """Hand a finished render back to the Tk thread. Runs on the worker thread."""
+        if future.cancelled():
+            return
+        try:
+            self.after(0, self._finish_render, pdf_doc, key, future)
+        except (RuntimeError, tk.TclError):
+            pass  # Application is shutting down
 
-        # Clear the canvas
-        self.canvas.delete("all")
+    def _finish_render(self, pdf_doc, key, future):
+        """Cache a finished render and display it if it is still wanted."""
+        try:
+            source = future.result()
+        except Exception as e:
+            if future is self._render_future:
+                # Report in the title bar; a modal dialog on every page flip
+                # would make a broken document impossible to navigate
+                self.title(f"Distraction-Free PDF Reader - Page {key[0] + 1}/{self.total_pages}"
+                           f" - Failed to render: {e}")
+            return
+        self._store_rendered(pdf_doc, key, source)
 
+    def _draw_page(self, page_index, width, height):
+        """Draw self.tk_img centered on the canvas and update the title."""
         # Center the image on the canvas
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        x_offset = (canvas_width - pix.width) // 2
-        y_offset = (canvas_height - pix.height) // 2
+        canvas_width, canvas_height = self._viewport
+        x_offset = (canvas_width - width) // 2
+        y_offset = (canvas_height - height) // 2
 
-        # Draw the image on the canvas
-        self.canvas.create_image(x_offset, y_offset, anchor=tk.NW, image=self.tk_img)
+        # Move the existing canvas item and swap its image
+        self.canvas.coords(self._canvas_item, x_offset, y_offset)
+        self.canvas.itemconfigure(self._canvas_item, image=self.tk_img)
 
         # Update window title
         self.title(f"Distraction-Free PDF Reader - Page {page_index + 1}/{self.total_pages} - Zoom: {self.zoom_level}%")
 
+    def _cache_key(self, page_index):
+        """Return the page cache key for page_index under the current view settings."""
+        return (page_index, self.zoom_level, self._viewport, self.night_mode, self.grayscale)
+
+    def _rasterize(self, pdf_doc, page_index, zoom_level, viewport, night_mode, grayscale):
+        """Rasterize a page to a pixmap.
+
+        At 100% zoom the page is scaled to fit the viewport, so no pixels are
+        rendered beyond what the canvas can show. In night mode the colors
+        are inverted in place. Grayscale pages use a single channel, which
+        cuts the bytes moved per page to a third.
+        """
+        with self._render_lock:
+            page = pdf_doc[page_index]
+            fit = min(viewport[0] / page.rect.width, viewport[1] / page.rect.height)
+            scale = fit * zoom_level / 100
+            colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=colorspace)
+        if night_mode:
+            pix.invert_irect()  # Done in C by MuPDF, no per-pixel Python work
+        return pix
+
+    def _render_source(self, pdf_doc, cache_dir, key):
+        """Return PhotoImage data for a cache key.
+
+        Pages found in the disk cache are decompressed; anything else is
+        rasterized, and its compressed PPM is written to the disk cache afterwards.
+        """
+        path = self._disk_cache_path(cache_dir, key)
+        try:
+            with open(path, "rb") as f:
+                data = zlib.decompress(f.read())
+            os.utime(path)  # Mark as recently used for eviction
+            return data
+        except OSError:
+            pass
+        except zlib.error:
+            # Empty, truncated or corrupt; render it again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        pix = self._rasterize(pdf_doc, *key)
+        source = self._photo_source(pix)
+        self._disk_writer.submit(self._write_disk_cache, path, source)
+        return source
+
+    def _write_disk_cache(self, path, source):
+        """Save a rendered page's PPM data compressed. Runs on the disk writer thread."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write under a temporary name so readers never see a partial file
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            # Level 1 is ~3x faster than the default and only slightly larger
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(source, 1))
+            os.replace(tmp_path, path)
+        except Exception:
+            return  # The disk cache is best-effort
+        self._prune_disk_cache()
+
+    def _prune_disk_cache(self):
+        """Delete the least recently used files until the cache fits DISK_CACHE_MAX_BYTES."""
+        entries = []
+        for dirpath, _, filenames in os.walk(DISK_CACHE_ROOT):
+            for name in filenames:
+                if not name.endswith(".ppm.z"):
+                    continue
+                file_path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, file_path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_path in sorted(entries):
+            if total <= DISK_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue
+            total -= size
+            try:
+                os.rmdir(os.path.dirname(file_path))  # Only succeeds once empty
+            except OSError:
+                pass
+
+    def _disk_cache_path(self, cache_dir, key):
+        """Return the disk cache file for a cache key."""
+        page_index, zoom_level, (width, height), night_mode, grayscale = key
+        suffix = ("_night" if night_mode else "") + ("_gray" if grayscale else "")
+        return os.path.join(cache_dir, f"{page_index}_{zoom_level}_{width}x{height}{suffix}.ppm.z")
+
+    def _photo_source(self, pix):
+        """Return PPM (PGM for grayscale) data that Tk decodes natively."""
+        return pix.tobytes("ppm")
+
+    def _cache_page(self, key, source):
+        """Build a PhotoImage from source and store it in the page cache.
+
+        Must be called on the Tk thread. Returns (PhotoImage, width, height).
+        """
+        photo = tk.PhotoImage(data=source)
+        entry = (photo, photo.width(), photo.height())
+        self._page_cache[key] = entry
+        self._page_cache.move_to_end(key)
+        if len(self._page_cache) > self.PAGE_CACHE_SIZE:
+            self._page_cache.popitem(last=False)
+        return entry
+
+    def _schedule_prefetch(self, page_index):
+        """Queue the neighbours of page_index for background rendering."""
+        # Drop requests left over from pages the user has already moved past
+        try:
+            while True:
+                self._prefetch_q.get_nowait()
+        except queue.Empty:
+            pass
+        for idx in (page_index + 1, page_index - 1):
+            key = self._cache_key(idx)
+            if 0 <= idx < self.total_pages and key not in self._page_cache:
+                self._prefetch_q.put((self.pdf_doc, self._disk_cache_dir, key))
+
+    def _prefetch_worker(self):
+        """Background loop rendering queued pages into PhotoImage sources."""
+        while True:
+            pdf_doc, cache_dir, key = self._prefetch_q.get()
+            try:
+                source = self._render_source(pdf_doc, cache_dir, key)
+            except Exception:
+                continue
+            try:
+                # PhotoImage must be created on the Tk thread
+                self.after(0, self._store_rendered, pdf_doc, key, source)
+            except (RuntimeError, tk.TclError):
+                return  # Application is shutting down
+
+    def _store_rendered(self, pdf_doc, key, source):
+        """Insert a rendered page into the cache unless the document has changed.
+
+        If it is the page the user is waiting for, swap it onto the canvas.
+        """
+        if pdf_doc is not self.pdf_doc or key in self._page_cache:
+            return
+        self._cache_page(key, source)
+        if key == self._cache_key(self.current_page_index):
+            self.show_page(self.current_page_index)
+
     def show_next_page(self):
         """Show the next page if available."""
         if self.current_page_index < self.total_pages - 1:
@@ -153,14 +406,108 @@ class PDFReader(tk.Tk):
         else:
             self.destroy()
 
+    def toggle_night_mode(self, event=None):
+        """Toggle rendering pages with inverted colors."""
+        self.night_mode = not self.night_mode
+        self.show_page(self.current_page_index)
+
+    def toggle_grayscale(self, event=None):
+        """Toggle rendering pages in grayscale."""
+        self.grayscale = not self.grayscale
+        self.show_page(self.current_page_index)
+
+    def on_canvas_resize(self, event):
+        """Re-render the current page once the canvas has settled on a new size."""
+        if self._pending_page is not None:
+            # First layout pass: render straight away at the real size
+            if event.width > 10:
+                self._viewport = (event.width, event.height)
+                page_index, self._pending_page = self._pending_page, None
+                self.show_page(page_index)
+            return
+        if self._resize_after:
+            self.after_cancel(self._resize_after)
+            self._resize_after = None
+        if (event.width, event.height) == self._viewport:
+            return  # Back to the size already rendered, e.g. after a quick drag
+        self._resize_after = self.after(100, self._apply_resize, event.width, event.height)
+
+    def _apply_resize(self, width, height):
+        """Adopt the new canvas size and redraw at the matching resolution."""
+        self._resize_after = None
+        self._viewport = (width, height)
+        self._page_cache.clear()  # Entries rendered for the old size are useless now
+        self.show_page(self.current_page_index)
+
     def zoom_in(self, event=None):
         """Zoom in by increasing the zoom level."""
         self.zoom_level = min(self.zoom_level + 10, 300)  # Cap at 300%
-        self.show_page(self.current_page_index)
+        self._show_zoom_preview()
+        self._schedule_zoom_render()
 
     def zoom_out(self, event=None):
         """Zoom out by decreasing the zoom level."""
         self.zoom_level = max(self.zoom_level - 10, 50)  # Cap at 50%
+        self._show_zoom_preview()
+        self._schedule_zoom_render()
+
+    def _schedule_zoom_render(self):
+        """Defer the re-render so a burst of zoom key presses renders only once."""
+        if self._zoom_after:
+            self.after_cancel(self._zoom_after)
+        self._zoom_after = self.after(30, self._apply_zoom)
+
+    def _show_zoom_preview(self):
+        """Show the current page scaled from its nearest cached zoom level.
+
+        Tk's integer zoom/subsample gives a blocky but instant approximation
+        until the exact render arrives from the background thread.
+        """
+        page_index = self.current_page_index
+        current = self._cache_key(page_index)
+        cached = [key for key in self._page_cache
+                  if key[0] == page_index and key[2:] == current[2:]]
+        if not cached:
+            return
+        key = min(cached, key=lambda k: abs(k[1] - self.zoom_level))
+        ratio = self._preview_ratio(self.zoom_level, key[1])
+        if ratio == 1:
+            return
+
+        photo, width, height = self._page_cache[key]
+        self.tk_img = tk.PhotoImage()
+        self.tk_img.tk.call(self.tk_img, "copy", photo,
+                            "-subsample", ratio.denominator, "-zoom", ratio.numerator)
+        width, height = self.tk_img.width(), self.tk_img.height()
+        self._draw_page(page_index, width, height)
+
+    @classmethod
+    def _preview_ratio(cls, zoom_level, cached_zoom):
+        """Return the zoom/subsample fraction closest to zoom_level / cached_zoom.
+
+        The result is only 1 when the zoom levels are equal, so even a single
+        10% step gets a visible preview.
+        """
+        target = fractions.Fraction(zoom_level, cached_zoom)
+        if target == 1:
+            return target
+        best = None
+        for subsample in range(1, cls.PREVIEW_MAX_SUBSAMPLE + 1):
+            zoom = max(1, round(target * subsample))
+            if zoom == subsample:
+                # Nudge away from 1 towards the requested direction
+                zoom += 1 if target > 1 else -1
+                if zoom == 0:
+                    continue
+            candidate = fractions.Fraction(zoom, subsample)
+            if best is None or abs(candidate - target) < abs(best - target):
+                best = candidate
+        return best
+
+    def _apply_zoom(self):
+        """Render the current page at the settled zoom level."""
+        self._zoom_after = None
+        # Any preview stays on screen until the exact render is swapped in
         self.show_page(self.current_page_index)
 
 def main():
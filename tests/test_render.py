@@ -0,0 +1,295 @@
+import collections
+import concurrent.futures
+import fractions
+import os
+import queue
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+try:
+    import fitz  # PyMuPDF
+    import ereader
+except ImportError:  # pragma: no cover - PyMuPDF or Tk not installed
+    ereader = None
+
+
+def make_pdf():
+    """Return an in-memory one-page PDF with some text on a white page."""
+    doc = fitz.open()
+    page = doc.new_page(width=200, height=300)
+    page.insert_text((20, 40), "Hello, reader")
+    return doc
+
+
+def make_reader(test):
+    """Return a PDFReader with only the render state set up, without a Tk window.
+
+    Pending disk writes are waited for when the test finishes, before any
+    cleanup registered earlier (such as removing a temp dir) runs.
+    """
+    reader = ereader.PDFReader.__new__(ereader.PDFReader)
+    reader._render_lock = threading.Lock()
+    reader._disk_writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    test.addCleanup(lambda: reader._disk_writer.shutdown(wait=True))
+    return reader
+
+
+@unittest.skipIf(ereader is None, "PyMuPDF is not installed")
+class RasterizeTest(unittest.TestCase):
+    def setUp(self):
+        self.doc = make_pdf()
+        self.reader = make_reader(self)
+
+    def test_fits_page_to_viewport(self):
+        pix = self.reader._rasterize(self.doc, 0, 100, (400, 800), False, False)
+        self.assertEqual((pix.width, pix.height), (400, 600))
+        self.assertEqual(pix.n, 3)
+        self.assertFalse(pix.alpha)
+
+    def test_zoom_scales_fitted_size(self):
+        pix = self.reader._rasterize(self.doc, 0, 150, (400, 800), False, False)
+        self.assertEqual((pix.width, pix.height), (600, 900))
+
+    def test_grayscale_uses_one_channel(self):
+        pix = self.reader._rasterize(self.doc, 0, 100, (400, 800), False, True)
+        self.assertEqual(pix.n, 1)
+        self.assertTrue(self.reader._photo_source(pix).startswith(b"P5"))
+
+    def test_night_mode_inverts_background(self):
+        day = self.reader._rasterize(self.doc, 0, 100, (400, 800), False, False)
+        night = self.reader._rasterize(self.doc, 0, 100, (400, 800), True, False)
+        self.assertEqual(day.pixel(0, 0), (255, 255, 255))
+        self.assertEqual(night.pixel(0, 0), (0, 0, 0))
+
+    def test_photo_source_is_ppm(self):
+        pix = self.reader._rasterize(self.doc, 0, 100, (400, 800), False, False)
+        self.assertTrue(self.reader._photo_source(pix).startswith(b"P6"))
+
+
+@unittest.skipIf(ereader is None, "PyMuPDF is not installed")
+class RenderSourceTest(unittest.TestCase):
+    key = (0, 100, (400, 800), False, False)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.doc = make_pdf()
+        self.reader = make_reader(self)
+        patcher = mock.patch.object(ereader, "DISK_CACHE_ROOT", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache_dir = os.path.join(tmp.name, "doc")
+
+    def flush_writes(self):
+        self.reader._disk_writer.shutdown(wait=True)
+        self.reader._disk_writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def test_miss_returns_ppm_and_writes_cache_later(self):
+        source = self.reader._render_source(self.doc, self.cache_dir, self.key)
+        self.assertTrue(source.startswith(b"P6"))
+        self.flush_writes()
+        path = self.reader._disk_cache_path(self.cache_dir, self.key)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(path)])
+
+    def test_hit_returns_rendered_ppm(self):
+        rendered = self.reader._render_source(self.doc, self.cache_dir, self.key)
+        self.flush_writes()
+        path = self.reader._disk_cache_path(self.cache_dir, self.key)
+        self.assertLess(os.path.getsize(path), len(rendered))
+        with mock.patch.object(self.reader, "_rasterize") as rasterize:
+            source = self.reader._render_source(self.doc, self.cache_dir, self.key)
+        rasterize.assert_not_called()
+        self.assertEqual(source, rendered)
+
+    def test_evicts_least_recently_used_over_limit(self):
+        old_key = (0, 100, (400, 800), False, False)
+        new_key = (0, 100, (400, 800), True, False)
+        old_path = self.reader._disk_cache_path(self.cache_dir, old_key)
+        new_path = self.reader._disk_cache_path(self.cache_dir, new_key)
+
+        self.reader._render_source(self.doc, self.cache_dir, old_key)
+        self.flush_writes()
+        os.utime(old_path, (1, 1))
+        limit = os.path.getsize(old_path) + 1
+        with mock.patch.object(ereader, "DISK_CACHE_MAX_BYTES", limit):
+            self.reader._render_source(self.doc, self.cache_dir, new_key)
+            self.flush_writes()
+
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(new_path))
+
+    def test_empty_cache_file_is_a_miss(self):
+        path = self.reader._disk_cache_path(self.cache_dir, self.key)
+        os.makedirs(self.cache_dir)
+        open(path, "wb").close()
+
+        source = self.reader._render_source(self.doc, self.cache_dir, self.key)
+
+        self.assertTrue(source.startswith(b"P6"))
+        self.flush_writes()
+        self.assertGreater(os.path.getsize(path), 0)
+
+    def test_truncated_cache_file_is_deleted_and_rerendered(self):
+        self.reader._render_source(self.doc, self.cache_dir, self.key)
+        self.flush_writes()
+        path = self.reader._disk_cache_path(self.cache_dir, self.key)
+        with open(path, "r+b") as f:
+            f.truncate(100)
+
+        with mock.patch.object(self.reader, "_disk_writer") as writer:
+            source = self.reader._render_source(self.doc, self.cache_dir, self.key)
+
+        self.assertTrue(source.startswith(b"P6"))
+        self.assertFalse(os.path.exists(path))
+        writer.submit.assert_called_once()
+
+
+@unittest.skipIf(ereader is None, "PyMuPDF is not installed")
+class PageCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used_page(self):
+        reader = make_reader(self)
+        reader._page_cache = collections.OrderedDict()
+        size = reader.PAGE_CACHE_SIZE
+        with mock.patch.object(ereader.tk, "PhotoImage"):
+            for page_index in range(size):
+                reader._cache_page((page_index, 100), b"P6")
+            reader._page_cache.move_to_end((0, 100))  # Page 0 was shown again
+            reader._cache_page((size, 100), b"P6")
+
+        self.assertEqual(len(reader._page_cache), size)
+        self.assertNotIn((1, 100), reader._page_cache)
+        self.assertIn((0, 100), reader._page_cache)
+        self.assertEqual(next(reversed(reader._page_cache)), (size, 100))
+
+
+@unittest.skipIf(ereader is None, "PyMuPDF is not installed")
+class PrefetchTest(unittest.TestCase):
+    def test_replaces_stale_requests_with_uncached_neighbours(self):
+        reader = make_reader(self)
+        reader._prefetch_q = queue.Queue()
+        reader.pdf_doc, reader._disk_cache_dir = mock.sentinel.doc, "cache"
+        reader.total_pages = 3
+        reader.zoom_level, reader._viewport = 100, (400, 800)
+        reader.night_mode = reader.grayscale = False
+        reader._page_cache = {reader._cache_key(1): None}
+        reader._prefetch_q.put(("stale", "cache", reader._cache_key(2)))
+
+        reader._schedule_prefetch(0)  # Page 1 is cached and page -1 does not exist
+        self.assertTrue(reader._prefetch_q.empty())
+
+        reader._schedule_prefetch(1)
+        queued = []
+        while not reader._prefetch_q.empty():
+            queued.append(reader._prefetch_q.get_nowait())
+        self.assertEqual(queued, [
+            (mock.sentinel.doc, "cache", reader._cache_key(2)),
+            (mock.sentinel.doc, "cache", reader._cache_key(0)),
+        ])
+
+
+@unittest.skipIf(ereader is None, "PyMuPDF is not installed")
+class FinishRenderTest(unittest.TestCase):
+    def test_failure_is_reported_without_a_dialog(self):
+        reader = make_reader(self)
+        future = concurrent.futures.Future()
+        future.set_exception(RuntimeError("boom"))
+        reader._render_future = future
+        reader.total_pages = 3
+        reader.title = mock.Mock()
+        reader._store_rendered = mock.Mock()
+
+        with mock.patch.object(ereader.messagebox, "showerror") as showerror:
+            reader._finish_render(None, (1, 100, (400, 800), False, False), future)
+
+        showerror.assert_not_called()
+        reader._store_rendered.assert_not_called()
+        self.assertIn("Page 2/3 - Failed to render: boom", reader.title.call_args.args[0])
+
+
+@unittest.skipIf(ereader is None, "PyMuPDF is not installed")
+class CanvasResizeTest(unittest.TestCase):
+    def setUp(self):
+        self.reader = make_reader(self)
+        self.reader._pending_page = None
+        self.reader._viewport = (800, 600)
+        self.reader._resize_after = None
+        self.reader.after = mock.Mock(return_value="after#1")
+        self.reader.after_cancel = mock.Mock()
+
+    def test_returning_to_rendered_size_cancels_pending_resize(self):
+        self.reader.on_canvas_resize(mock.Mock(width=1024, height=768))
+        self.reader.on_canvas_resize(mock.Mock(width=800, height=600))
+
+        self.reader.after.assert_called_once()
+        self.reader.after_cancel.assert_called_once_with("after#1")
+        self.assertIsNone(self.reader._resize_after)
+
+
+    def test_first_real_configure_shows_pending_page(self):
+        self.reader._pending_page = 0
+        self.reader._viewport = (1, 1)
+        self.reader.show_page = mock.Mock()
+
+        self.reader.on_canvas_resize(mock.Mock(width=1, height=1))
+        self.reader.show_page.assert_not_called()
+        self.assertEqual(self.reader._pending_page, 0)
+
+        self.reader.on_canvas_resize(mock.Mock(width=800, height=600))
+        self.reader.show_page.assert_called_once_with(0)
+        self.assertIsNone(self.reader._pending_page)
+        self.assertEqual(self.reader._viewport, (800, 600))
+        self.reader.after.assert_not_called()
+
+@unittest.skipIf(ereader is None, "PyMuPDF is not installed")
+class ZoomDebounceTest(unittest.TestCase):
+    def test_burst_of_zoom_steps_renders_once(self):
+        reader = make_reader(self)
+        reader.zoom_level = 100
+        reader._zoom_after = None
+        reader._show_zoom_preview = mock.Mock()
+        reader.after = mock.Mock(side_effect=["after#1", "after#2"])
+        reader.after_cancel = mock.Mock()
+
+        reader.zoom_in()
+        reader.zoom_in()
+
+        self.assertEqual(reader.zoom_level, 120)
+        reader.after_cancel.assert_called_once_with("after#1")
+        reader.after.assert_called_with(30, reader._apply_zoom)
+        self.assertEqual(reader._zoom_after, "after#2")
+        self.assertEqual(reader._show_zoom_preview.call_count, 2)
+
+
+@unittest.skipIf(ereader is None, "PyMuPDF is not installed")
+class PreviewRatioTest(unittest.TestCase):
+    def preview_width(self, width, ratio):
+        """Width of a Tk "copy -subsample d -zoom n" of an image width pixels wide."""
+        return -(-width // ratio.denominator) * ratio.numerator
+
+    def test_single_step_is_not_identity(self):
+        for zoom_level, cached_zoom in [(110, 100), (90, 100), (210, 200), (290, 300)]:
+            self.assertNotEqual(ereader.PDFReader._preview_ratio(zoom_level, cached_zoom), 1)
+
+    def test_exact_ratios_are_kept(self):
+        self.assertEqual(ereader.PDFReader._preview_ratio(50, 300), fractions.Fraction(1, 6))
+        self.assertEqual(ereader.PDFReader._preview_ratio(300, 100), 3)
+        self.assertEqual(ereader.PDFReader._preview_ratio(150, 100), fractions.Fraction(3, 2))
+        self.assertEqual(ereader.PDFReader._preview_ratio(100, 100), 1)
+
+    def test_preview_size_close_to_target(self):
+        width = 800
+        for zoom_level in range(50, 301, 10):
+            for cached_zoom in range(50, 301, 10):
+                ratio = ereader.PDFReader._preview_ratio(zoom_level, cached_zoom)
+                expected = width * zoom_level / cached_zoom
+                self.assertLessEqual(
+                    round(abs(self.preview_width(width, ratio) - expected) / expected, 6), 0.1,
+                    (zoom_level, cached_zoom, ratio),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()